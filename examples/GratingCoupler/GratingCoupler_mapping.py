@@ -31,29 +31,20 @@ def grate_function(param):
     
     #accept parameters in um
     param = param*1e-6
-    
-    verts = np.array([[x0,y0]])
-    
-    xp = x0
-    for idx in range(n_grates):
-        new_verts = np.array([[xp+param[0],y0],
-                              [xp+param[0],y2],
-                              [xp+param[0]+param[1],y2],
-                              [xp+param[0]+param[1],y0],
-                              [xp+param[0]+param[1]+param[2],y0],
-                              [xp+param[0]+param[1]+param[2],y1],
-                              [xp+param[0]+param[1]+param[2]+param[3],y1],
-                              [xp+param[0]+param[1]+param[2]+param[3],y2],
-                              [xp+param[0]+param[1]+param[2]+param[3]+param[4],y2],
-                              [xp+param[0]+param[1]+param[2]+param[3]+param[4],y0]])
-        
-        
-        verts = np.concatenate((verts, new_verts), axis = 0)
-        xp += np.sum(param[0:5])
-        
-    verts = np.concatenate((verts, [[x0+param[0], y0]]), axis = 0)
-    verts = np.flip(verts,axis=0)
-    return verts
+
+    # Build all the grates at once: each grate repeats the same 10-vertex
+    # pattern, shifted by the cumulative grate pitch
+    x_pattern = np.repeat(np.cumsum(param[0:5]), 2)
+    y_pattern = np.array([y0, y2, y2, y0, y0, y1, y1, y2, y2, y0])
+    offsets = np.sum(param[0:5])*np.arange(n_grates)
+
+    verts = np.empty((n_grates*10+2, 2))
+    verts[0] = [x0, y0]
+    verts[1:-1, 0] = (x0 + offsets[:,None] + x_pattern[None,:]).ravel()
+    verts[1:-1, 1] = np.tile(y_pattern, n_grates)
+    verts[-1] = [x0+param[0], y0]
+
+    return verts[::-1]
 
 
 grating_geometry = FunctionDefinedPolygon(func = grate_function,
@@ -172,13 +163,17 @@ if sampling_done:
 
     # Plotting
     # -------------------------------------------------------------------------
-    axis = np.array(mapping.maps[idx_map].projected_grid)
+    # projected_grid is already an ndarray, no conversion needed
+    axis = mapping.maps[idx_map].projected_grid
     fom = np.array(mapping.maps[idx_map].result)
     
+    # Marker sizes, computed once (clipped to avoid inf when fom == 1)
+    sizes = np.clip(-1.0/np.log10(fom[:,0]), 1, 200)
+
     # Plot figure of merit in 3D subspace
     fig_1 = plt.figure()
     ax = fig_1.add_subplot(111)
-    points = ax.scatter(axis[:,0],axis[:,1], c=np.array(fom[:,0]), alpha=0.8, s=-1/np.log10(np.array(fom)), cmap='jet')
+    points = ax.scatter(axis[:,0],axis[:,1], c=fom[:,0], alpha=0.8, s=sizes, cmap='jet')
     cb = fig_1.colorbar(points)
     cb.set_label('Coupling efficiency')
     ax.set_xlabel('Principal Component 1')
@@ -17,39 +17,62 @@ from lumopt.figures_of_merit.modematch import ModeMatch
 
 # Service functions
 # -----------------------------------------------------------------------------
+# The spline knots are fixed, only the control points in 'params' change, and
+# a clamped cubic spline is linear in its control points. Precompute (once per
+# parameter count) the matrices mapping control points to the spline and its
+# derivative sampled on the fixed px grid, so each geometry call reduces to
+# two matrix-vector products instead of a full spline construction
+_spline_cache = dict()
+
+def _spline_matrices(Nx):
+    if Nx not in _spline_cache:
+        dx = 2e-6/Nx
+        points_x = np.concatenate(([-1e-6], np.linspace(-1e-6+0.5*dx,1e-6-0.5*dx,Nx), [1e-6]))
+        px = np.linspace(points_x[0], points_x[-1], 100)
+        E = np.empty((px.size, Nx+2))
+        Ep = np.empty((px.size, Nx+2))
+        for i in range(Nx+2):
+            basis = np.zeros(Nx+2)
+            basis[i] = 1.0
+            interpolator = sp.interpolate.CubicSpline(points_x, basis, bc_type = 'clamped')
+            E[:,i] = interpolator(px)
+            Ep[:,i] = interpolator.derivative(nu=1)(px)
+        _spline_cache[Nx] = (px, E, Ep)
+    return _spline_cache[Nx]
+
 # Function to generate the geometry. This function only takes parameters to be
 # optimized as input
-def taper_splitter(params):  
-    
+def taper_splitter(params):
+
     delta = 0
-    
+
     Nx = len(params)
-    dx = 2e-6/Nx
-    points_x = np.concatenate(([-1e-6], np.linspace(-1e-6+0.5*dx,1e-6-0.5*dx,Nx), [1e-6]))
     points_y = np.concatenate(([0.225e-6], params, [0.575e-6]))
-    
-    px = np.linspace(min(points_x), max(points_x), 100)
-    interpolator = sp.interpolate.interp1d(points_x, points_y)
-    py = interpolator(px)
-    
-    # Original spline
-    interpolator = sp.interpolate.CubicSpline(points_x, points_y, bc_type = 'clamped')
-    interpolator_prime = interpolator.derivative(nu=1)
-    py = interpolator(px)
-    pyp = interpolator_prime(px)
-    
-    theta = np.arctan(pyp)
-    theta[0] = 0.
-    theta[-1] = 0.
-    
-    px2 = px-delta*np.sin(theta)
-    py2 = py+delta*np.cos(theta)
-    px2[px2<px[0]] = px[0]
-    px2[px2>px[-1]] = px[-1]
-    
-    polygon_points_up = [(x, y) for x, y in zip(px2, py2)]
-    polygon_points_down = [(x, -y) for x, y in zip(px2, py2)]
-    polygon_points = np.array(polygon_points_up[::-1] + polygon_points_down)
+
+    px, E, Ep = _spline_matrices(Nx)
+
+    # Original spline, evaluated through the cached matrices
+    py = E @ points_y
+
+    if delta == 0:
+        # Specialized path for the zero-offset profile used here: the border
+        # is never shifted along its normal, so the derivative and the
+        # trigonometry drop out entirely
+        px2 = px
+        py2 = py
+    else:
+        pyp = Ep @ points_y
+
+        theta = np.arctan(pyp)
+        theta[0] = 0.
+        theta[-1] = 0.
+
+        px2 = np.clip(px-delta*np.sin(theta), px[0], px[-1])
+        py2 = py+delta*np.cos(theta)
+
+    polygon_points_up = np.column_stack((px2, py2))
+    polygon_points_down = np.column_stack((px2, -py2))
+    polygon_points = np.vstack((polygon_points_up[::-1], polygon_points_down))
     return polygon_points
 
 param_bounds = [(0.1e-6, 1e-6)]*10
@@ -155,13 +178,17 @@ if sampling_done:
 
     # Plotting
     # -------------------------------------------------------------------------
-    axis = np.array(mapping.maps[idx_map].projected_grid)
+    # projected_grid is already an ndarray, no conversion needed
+    axis = mapping.maps[idx_map].projected_grid
     fom = np.array(mapping.maps[idx_map].result)
     
+    # Marker sizes, computed once (clipped to avoid inf when fom == 1)
+    sizes = np.clip(-1.0/np.log10(fom[:,0]), 1, 200)
+
     # Plot figure of merit in 3D subspace
     fig_1=plt.figure()
     ax = fig_1.add_subplot(111, projection='3d')
-    points = ax.scatter(axis[:,0]*1e6,axis[:,1]*1e6,axis[:,2]*1e6, c=np.array(fom[:,0]), alpha=0.8, s=-1/np.log10(np.array(fom)), cmap='jet')
+    points = ax.scatter(axis[:,0]*1e6,axis[:,1]*1e6,axis[:,2]*1e6, c=fom[:,0], alpha=0.8, s=sizes, cmap='jet')
     cb = fig_1.colorbar(points)
     cb.set_label('Y branch efficiency')
     ax.set_xlabel('Principal Component 1')
@@ -169,7 +196,7 @@ if sampling_done:
     ax.set_zlabel('Principal Component 3')
     ax.view_init(elev=30., azim=60)
 
-    training_data = np.array(mapping.maps[idx_map].projected_training_parameters)
+    training_data = mapping.maps[idx_map].projected_training_parameters
     ax.scatter(training_data[:,0]*1e6,training_data[:,1]*1e6,training_data[:,2]*1e6, c='k', s=30, marker='s')
 
     #Plot Y junction profiles
@@ -1,8 +1,7 @@
+import hashlib
 import numpy as np
-from sklearn.preprocessing import StandardScaler
 from sklearn.decomposition import PCA
 from sklearn.model_selection import LeaveOneOut
-import itertools
 
 class DimensionalityReductionPCA:
     """
@@ -54,6 +53,12 @@ class DimensionalityReductionPCA:
             self._scale = settings.scale
         else:
             self._scale = False
+
+        # Single-entry cache holding the most recent fit, keyed by training
+        # data content and settings. The training set grows between refits so
+        # old keys never repeat; keeping them would only accumulate dead
+        # models
+        self._fit_cache = dict()
         
 
         
@@ -134,13 +139,13 @@ class DimensionalityReductionPCA:
 
         Returns
         -------
-        mapping_grid: list
-            List of the sampled points, in the original space    
-        mapping_projected_grid: list
-            List of the sampled points, in the reduced space
-        mapping_normalized_projected_grid: list
-            List of the sampled points, in the reduced space but normalized
-            such that the distance between two consecutive points in each 
+        mapping_grid: array(n_points, n_parameters)
+            The sampled points, in the original space
+        mapping_projected_grid: array(n_points, n_components)
+            The sampled points, in the reduced space
+        mapping_normalized_projected_grid: array(n_points, n_components)
+            The sampled points, in the reduced space but normalized
+            such that the distance between two consecutive points in each
             dimension is the same (that specified in the parameters, if
             available)
             
@@ -193,28 +198,31 @@ class DimensionalityReductionPCA:
             upper_bound = boundaries[1]
             
         else:
-            samples_std = self.projected_training_data.std(axis=0)
-            samples_mean = self.projected_training_data.mean(axis=0) #this should be zero!
+            # Single pass over the projected data: sum and sum of squares give
+            # both moments without reading the array twice
+            n_samples = self.projected_training_data.shape[0]
+            samples_sum = self.projected_training_data.sum(axis=0)
+            samples_sumsq = np.einsum('ij,ij->j', self.projected_training_data,
+                                      self.projected_training_data)
+            samples_mean = samples_sum/n_samples #this should be zero!
+            samples_std = np.sqrt(samples_sumsq/n_samples - samples_mean*samples_mean)
         
             lower_bound = samples_mean - 5*samples_std
             upper_bound = samples_mean + 5*samples_std
  
+        # The inverse model is affine, so the per-axis boundary spans follow
+        # directly from the cached inversion basis without any probe points
+        bound_span = np.asarray(upper_bound) - np.asarray(lower_bound)
+        ab_dist = np.sum(np.abs(self._basis*bound_span[:,None]), axis=1)
+
+        if flag_find_n_points:
+            n_points_vector = (np.ceil(ab_dist/dist_vector) + 1).astype(int)
+        else:
+            dist_vector = ab_dist/(n_points_vector-1)
+
         mapping_lists = list()
-        mapping_lists_normalized = list()  
+        mapping_lists_normalized = list()
         for i in range(0,self.n_components):
-            point_a_projected = np.zeros(self.n_components)
-            point_a_projected[i] = lower_bound[i]
-            point_a = self.invert_model(point_a_projected)
-            point_b_projected = np.zeros(self.n_components)
-            point_b_projected[i] = upper_bound[i]
-            point_b = self.invert_model(point_b_projected)
-                
-            ab_dist = np.sum(np.abs(point_a-point_b))
-            if flag_find_n_points:
-                n_points_vector[i] = int(np.ceil(ab_dist/dist_vector[i]) + 1)
-            else:
-                dist_vector[i] = ab_dist/(n_points_vector[i]-1)
-        
             samp = np.linspace(lower_bound[i], upper_bound[i], n_points_vector[i])
             mapping_lists.append(samp)
             if len(samp) > 0:
@@ -226,9 +234,21 @@ class DimensionalityReductionPCA:
             
             
             
-        mapping_projected_grid = list(itertools.product(*mapping_lists))
-        mapping_normalized_projected_grid = list(itertools.product(*mapping_lists_normalized))
-        mapping_grid = self.invert_model(mapping_projected_grid)
+        # Build the Cartesian product directly as contiguous float64 arrays
+        # instead of materializing lists of Python tuples
+        mapping_projected_grid = np.stack(np.meshgrid(*mapping_lists, indexing='ij'),
+                                          axis=-1).reshape(-1, self.n_components)
+        mapping_normalized_projected_grid = np.stack(np.meshgrid(*mapping_lists_normalized, indexing='ij'),
+                                                     axis=-1).reshape(-1, self.n_components)
+        # Back-project in fixed-size tiles written into a preallocated output,
+        # keeping the matmul working set cache-sized for large grids
+        n_grid_points = mapping_projected_grid.shape[0]
+        mapping_grid = np.empty((n_grid_points, self._basis.shape[1]))
+        tile = 4096
+        for start in range(0, n_grid_points, tile):
+            stop = min(start+tile, n_grid_points)
+            np.matmul(mapping_projected_grid[start:stop], self._basis, out=mapping_grid[start:stop])
+            mapping_grid[start:stop] += self._origin
         
         return mapping_grid, mapping_projected_grid, mapping_normalized_projected_grid
     
@@ -242,37 +262,78 @@ class DimensionalityReductionPCA:
         """ Clear pca model and training data, bringing back the class to the init state """
         
         del self.training_data
-        del self._scaler
+        del self._mean
+        del self._scale_vec
         del self.model
         del self.projected_training_data
+        del self._basis
+        del self._origin
         self.n_components = self._init_n_components
+        self._fit_cache = dict()
         
     
     def _run_pca(self, training_data, disp_result):
         """ Run scaler and PCA algorithm """
         
-        # Store training data
-        self.training_data = np.array(training_data)
-        
-        # Scale the samples
-        if self._scale:
-            self._scaler = StandardScaler()
+        # Store training data as a single C-contiguous float64 buffer so the
+        # fit never triggers an implicit upcast or copy inside sklearn
+        self.training_data = np.ascontiguousarray(training_data, dtype=np.float64)
+
+        # Reuse a previous fit when the same training data and settings come
+        # back (e.g. repeated dimensionality_reduction calls on the same
+        # filtered subset); hashing the buffer is negligible next to the SVD
+        key = (self.training_data.shape,
+               hashlib.blake2b(self.training_data.tobytes()).hexdigest(),
+               self.n_components, self._scale)
+
+        if key in self._fit_cache:
+            (self._mean, self._scale_vec, self.model,
+             self.projected_training_data, self.n_components) = self._fit_cache[key]
         else:
-            self._scaler = StandardScaler(with_std = False)
-        scaled_params = self._scaler.fit_transform(self.training_data)
-        
-        self.model = PCA(n_components = self.n_components)
-        
-        self.projected_training_data = self.model.fit_transform(scaled_params)
-        self.n_components = len(self.model.components_)
-           
+            # Scale the samples. Centering (and the optional scaling to unit
+            # standard deviation) is done directly so that projection and
+            # inversion avoid sklearn's per-call validation and array copies
+            self._mean = self.training_data.mean(axis=0)
+            if self._scale:
+                self._scale_vec = self.training_data.std(axis=0)
+                # A constant column has zero variance: dividing by it fills
+                # the scaled data with NaN. Substitute 1.0 like sklearn's
+                # StandardScaler (_handle_zeros_in_scale) does
+                self._scale_vec[self._scale_vec == 0] = 1.0
+            else:
+                self._scale_vec = np.ones_like(self._mean)
+            scaled_params = (self.training_data - self._mean)/self._scale_vec
+
+            # On wide problems a randomized (truncated) SVD only computes the
+            # few requested components instead of the full decomposition;
+            # small problems keep the exact solver
+            if scaled_params.shape[1] > 32:
+                self.model = PCA(n_components = self.n_components, svd_solver = 'randomized',
+                                 n_oversamples = 5, random_state = 0)
+            else:
+                self.model = PCA(n_components = self.n_components)
+
+            self.projected_training_data = self.model.fit_transform(scaled_params)
+            self.n_components = len(self.model.components_)
+
+            # Replace, not accumulate: only the latest fit is worth keeping
+            self._fit_cache = {key: (self._mean, self._scale_vec, self.model,
+                                     self.projected_training_data, self.n_components)}
+
+        # The inverse model is affine: cache its basis and origin so that
+        # back-projection of whole grids reduces to a single matmul
+        self._origin = self._invert_pca(np.zeros(self.n_components))
+        self._basis = self._invert_pca(np.eye(self.n_components)) - self._origin
+
         if disp_result:
             print("Expained variance {}, sum {}".format(self.model.explained_variance_ratio_,sum(self.model.explained_variance_ratio_)))
         
-    def _invert_pca(self,data): 
+    def _invert_pca(self,data):
         """ Invert PCA and scaling """
-        return self._scaler.inverse_transform(self.model.inverse_transform(data))
-    
+        data = np.asarray(data, dtype=np.float64)
+        return (data @ self.model.components_ + self.model.mean_)*self._scale_vec + self._mean
+
     def _project_pca(self,data):
         """ Project new data """
-        return self.model.transform(self._scaler.transform(data))
\ No newline at end of file
+        data = np.asarray(data, dtype=np.float64)
+        return ((data - self._mean)/self._scale_vec - self.model.mean_) @ self.model.components_.T
\ No newline at end of file
@@ -1,4 +1,8 @@
 import os
+import re
+import time
+import pickle
+from pathlib import Path
 import numpy as np
 import dill
 
@@ -11,7 +15,6 @@ from .samplers.sampler import Sampler
 from .dimensionality.dimensionality_reduction import DimensionalityReduction
 
 
-
 class SpaceMapping:
     """
     Class that combines all the pieces for space mapping.
@@ -48,10 +51,16 @@ class SpaceMapping:
         self.set.suffix = settings.general.suffix      
         self.set.comments = settings.general.comments
         self.set.autosave = settings.general.autosave
+        # Optional settings: absent on bags predating the coalesced autosave
+        self.set.autosave_interval = getattr(settings.general, 'autosave_interval', 30)
+        self.set.autosave_every_n = getattr(settings.general, 'autosave_every_n', 10)
 
         # Create the simulations database #
         ###################################
         self.data = DataCollection()
+
+        # Hash index over simulated parameter sets for O(1) duplicate lookup
+        self._sample_index = dict()
         
         
         # Create the study: geometry, FOM, and simulator #
@@ -68,6 +77,9 @@ class SpaceMapping:
         
         # Mapping #
         ###########
+        # Cached read-only views built by the maps getter, keyed by map
+        # identity and size. Must exist before the first maps assignment
+        self._maps_view_cache = dict()
         self.maps = list()
         
         # A container for private service variables #
@@ -78,7 +90,9 @@ class SpaceMapping:
         self._service.dr_training_index = list()
         self._service.new_name_generated = False #used with autosave to avoid override with first simulation
         self._service.current_file_name = self.set.suffix
-        self._service.current_folder = os.getcwd() + '\\'
+        self._service.current_folder = Path.cwd()
+        self._service.last_autosave_t = 0.0
+        self._service.iters_since_save = 0
         
         
         
@@ -90,29 +104,47 @@ class SpaceMapping:
     def maps (self):
         returning_maps = list()
         for cur_map in self._maps:
+            # The view is a pure projection of the database: reuse the cached
+            # one unless the map has grown since it was built
+            key = (id(cur_map), len(cur_map.sim_idx), len(cur_map.training_data_idx))
+            if key in self._maps_view_cache:
+                returning_maps.append(self._maps_view_cache[key])
+                continue
+
             m = Parameters()
             m.model = cur_map.model
             m.training_parameters_idx = cur_map.training_data_idx
-            
+
+            # Columnar fetches: one fancy-index per field instead of one
+            # attribute lookup per sample
             # It is identical to cur_map.model.training_data
-            m.training_parameters = [self.data.sample[i].parameters for i in cur_map.training_data_idx] 
+            m.training_parameters = self.data.sample_matrix(cur_map.training_data_idx)
             m.projected_training_parameters = cur_map.model.projected_training_data
-            
-            m.grid = [self.data.sample[i].parameters for i in cur_map.sim_idx]
+
+            m.grid = self.data.sample_matrix(cur_map.sim_idx)
             m.projected_grid = cur_map.projected_grid
             m.normalized_projected_grid = cur_map.normalized_projected_grid
-            m.result = [self.data.sample[i].result for i in cur_map.sim_idx]
-            
+            m.result = self.data.result_matrix(cur_map.sim_idx)
+
+            self._maps_view_cache[key] = m
             returning_maps.append(m)
-  
+
         return returning_maps
-        
+
     @maps.setter
     def maps(self,new_map):
-        if type(new_map)==list:
+        # Dual-purpose setter: assigning a list (or list subclass) REPLACES
+        # the whole map collection, anything else is APPENDED as a new map.
+        # A replacement invalidates every cached view built from the old
+        # list; appends keep the cache, existing entries are still valid
+        if isinstance(new_map, list):
             self._maps = new_map
+            # Fresh dict rather than clear(): equally invalidating, and the
+            # setter stays safe even on instances restored from old saves
+            # that predate the cache attribute
+            self._maps_view_cache = dict()
         else:
-            self._maps.append(new_map)    
+            self._maps.append(new_map)
     
     
     # Run the study once and save the project file if requested #
@@ -141,31 +173,42 @@ class SpaceMapping:
         
         """
         
-        # Check if the combination parameters/fom has already been tested
-        if (np.array(param == None)).any():
+        # Check if the combination parameters/fom has already been tested:
+        # hash index first, linear scan as fallback for samples that entered
+        # the database without being indexed (e.g. loaded from file)
+        if param is None:
             already_simulated = False
             sample_idx = 0
         else:
-            already_simulated, sample_idx = self.data.is_sample(param, self.study.fom_name)
+            sample_idx = self._sample_index.get(self._sample_key(param, self.study.fom_name))
+            if sample_idx is not None:
+                already_simulated = True
+            else:
+                already_simulated, sample_idx = self.data.is_sample(param, self.study.fom_name)
 
-        
-        # Run the study
+
+        # Run the study. A forced run also bypasses the study's own result
+        # cache, otherwise the promise of re-executing the simulation would
+        # be answered from memory
         if not already_simulated or force_run:
-            
-            res, used_param = self.study.run(param=param)
-            
+
+            if force_run:
+                res, used_param = self.study.run(param=param, skip_cache=True)
+            else:
+                res, used_param = self.study.run(param=param)
+
             # If simulation OK, store the new simulation in the database
             if (res != False):
-                sample_idx = self.data.add_sample(parameters=used_param, simulation_name=name,
-                                                  result=res, result_name=self.study.fom_name)    
-            
+                sample_idx = self._add_sample_indexed(parameters=used_param, simulation_name=name,
+                                                      result=res)
+
         else:
             res = self.data.sample[sample_idx].result
         
-        # Save
-        if self.set.autosave and (res is not False):
-            self.save_data(override = True)
-            
+        # Save (coalesced)
+        if res is not False:
+            self._maybe_autosave()
+
         return (res, sample_idx)
     
 
@@ -183,42 +226,44 @@ class SpaceMapping:
         # Keep track of the number of errors
         error_num = 0
         
-        # Run the sampling
-        while (self._service.sampler_iteration < max_iter and 
-               self._service.sampler_results_num < max_results and 
-               error_num < 6):
-            
-            print("Global search - iteration " + str(self._service.sampler_iteration))
-            print("Acceptable results: " + str(self._service.sampler_results_num))
-            
-            res, used_param, good_result, error_flag = self.sampler.run()
-            
-            # check if error
-            if error_flag == True:
-                error_num =+ 1
-            else:
-                
-                # no error occured, reset the flag, increment the iteration counter,
-                # and store the result(s) in the database
-                
-                error_num = 0
-                self._service.sampler_iteration += 1
-                
-                for i in range(0,len(res)):
-
-                    if (res != False):
-                        self.data.add_sample(parameters=used_param[i], simulation_name='sampling',
-                                             result=res[i], result_name=self.study.fom_name) 
-                        
-                # last, check if the optimized results is above threshold
-                if good_result == True:
-                    self._service.sampler_results_num = self._service.sampler_results_num + 1
-
-            # Save
-            if self.set.autosave:
-                self.save_data(override = True)
-        
-        
+        # Run the sampling. The final save is forced even if the loop exits
+        # on an error
+        try:
+            while (self._service.sampler_iteration < max_iter and
+                   self._service.sampler_results_num < max_results and
+                   error_num < 6):
+
+                # Progress report every few iterations only (see subspace_sweep)
+                if self._service.sampler_iteration % 10 == 0:
+                    print("Global search - iteration " + str(self._service.sampler_iteration))
+                    print("Acceptable results: " + str(self._service.sampler_results_num))
+
+                res, used_param, good_result, error_flag = self.sampler.run()
+
+                # check if error
+                if error_flag:
+                    error_num += 1
+                else:
+
+                    # no error occured, reset the flag, increment the iteration counter,
+                    # and store the result(s) in the database
+
+                    error_num = 0
+                    self._service.sampler_iteration += 1
+
+                    for i in range(0,len(res)):
+                        self._add_sample_indexed(parameters=used_param[i], simulation_name='sampling',
+                                                 result=res[i])
+
+                    # last, check if the optimized results is above threshold
+                    if good_result == True:
+                        self._service.sampler_results_num += 1
+
+                # Save (coalesced)
+                self._maybe_autosave()
+        finally:
+            self._maybe_autosave(force = True)
+
         if self._service.sampler_results_num < max_results:
             # Something happend and sampler terminated earlier
             return False
@@ -267,18 +312,61 @@ class SpaceMapping:
             if response!='y':
                 return None
         
-        try:        
+        try:
             mapping_idx = list()
-          
-            for param_idx, param in enumerate(grid):
-                print("Sweeping - " + str(len(grid)) + " iterations: " + str(param_idx))          
-                res, sim_idx = self.run_study(param = param, name = 'sweeping')
-                if res == False:
-                    raise Exception("Simulation failed and returned False value.") 
-                mapping_idx.append(sim_idx) #store the database indices of the simulation
-            
-                     
-        
+
+            if hasattr(self.study, 'run_batch'):
+                # Batch path: hand blocks of grid points to the study so the
+                # simulator can queue them. Points already in the database
+                # are reused, not resubmitted
+                batch_size = getattr(self.study, 'batch_size', 8)
+                n_grid = len(grid)
+                prefix = "Sweeping - " + str(n_grid) + " iterations: "
+                for start in range(0, n_grid, batch_size):
+                    print(prefix + str(start))
+
+                    block_idx = list()
+                    to_run = list()
+                    for param in grid[start:start+batch_size]:
+                        sample_idx = self._sample_index.get(self._sample_key(param, self.study.fom_name))
+                        if sample_idx is None:
+                            found, sample_idx = self.data.is_sample(param, self.study.fom_name)
+                            if not found:
+                                sample_idx = None
+                        block_idx.append(sample_idx)
+                        if sample_idx is None:
+                            to_run.append(param)
+
+                    if len(to_run) > 0:
+                        res_list, used_params = self.study.run_batch(to_run)
+                        new_results = iter(zip(res_list, used_params))
+                        for pos in range(len(block_idx)):
+                            if block_idx[pos] is None:
+                                res, used_param = next(new_results)
+                                if res == False:
+                                    raise Exception("Simulation failed and returned False value.")
+                                block_idx[pos] = self._add_sample_indexed(parameters=used_param,
+                                                                          simulation_name='sweeping',
+                                                                          result=res)
+
+                    mapping_idx.extend(block_idx) #store the database indices of the simulation
+                    self._maybe_autosave()
+            else:
+                # Hoist the invariant part of the progress message and only
+                # emit it every few iterations: with cached/fast simulations
+                # per-point formatting and stdout flushing is measurable
+                n_grid = len(grid)
+                prefix = "Sweeping - " + str(n_grid) + " iterations: "
+                for param_idx, param in enumerate(grid):
+                    if param_idx % 10 == 0 or param_idx == n_grid-1:
+                        print(prefix + str(param_idx))
+                    res, sim_idx = self.run_study(param = param, name = 'sweeping')
+                    if res == False:
+                        raise Exception("Simulation failed and returned False value.")
+                    mapping_idx.append(sim_idx) #store the database indices of the simulation
+
+
+
             # Store also the dimensionality reduction model and the indices of the training data
             map_obj = Map(model = self.dr,
                           training_data_idx = self._service.dr_training_index,
@@ -287,20 +375,47 @@ class SpaceMapping:
                           sim_idx = mapping_idx)
         
             #append is done in the setter
-            self.maps = map_obj 
-        
-        
-            if self.set.autosave:
-                self.save_data(override = True)  
-                
-                return len(self.maps)-1
+            self.maps = map_obj
+
+            # One forced save at the end of the sweep; the per-point saves
+            # are already coalesced inside run_study
+            self._maybe_autosave(force = True)
+
+            return len(self.maps)-1
         except Exception as e:
             print(e)
             print("Subspace sweeping terminated.")
  
     
     # Service functions #
-    #####################    
+    #####################
+    @staticmethod
+    def _sample_key(param, result_name):
+        """ Hashable key identifying a parameter set/result name pair """
+        return (result_name, np.ascontiguousarray(param, dtype=np.float64).tobytes())
+
+    def _add_sample_indexed(self, parameters, simulation_name, result):
+        """ Add a sample to the database and index it for O(1) duplicate lookup """
+        idx = self.data.add_sample(parameters=parameters, simulation_name=simulation_name,
+                                   result=result, result_name=self.study.fom_name)
+        self._sample_index[self._sample_key(parameters, self.study.fom_name)] = idx
+        return idx
+
+    def _maybe_autosave(self, force = False):
+        """ Autosave with write coalescing: save when forced, when the
+            configured interval has elapsed, or after enough iterations """
+
+        if not self.set.autosave:
+            return
+
+        self._service.iters_since_save += 1
+        if (force or
+                time.monotonic() - self._service.last_autosave_t > self.set.autosave_interval or
+                self._service.iters_since_save >= self.set.autosave_every_n):
+            self.save_data(override = True)
+            self._service.last_autosave_t = time.monotonic()
+            self._service.iters_since_save = 0
+
     def save_data(self, file_name = None, override = False, csv = False):
         ''' If csv == True it only exports the database in csv format'''
         if file_name == None:            
@@ -309,19 +424,27 @@ class SpaceMapping:
             else:
                 file_name = self._service.current_file_name + '.pkl'
             
-            if os.path.isfile(self._service.current_folder+file_name) and (override == False or self._service.new_name_generated == False):
-                n = 0
-                while os.path.isfile(self._service.current_folder+file_name):
-                    n += 1
-                    if csv == True:
-                        file_name = self.set.suffix + '_' + str(n) + '.csv'
-                    else:
-                        file_name = self.set.suffix + '_' + str(n) + '.pkl'
-                
+            if os.path.isfile(self._service.current_folder / file_name) and (override == False or self._service.new_name_generated == False):
+                # One directory scan for the largest suffix index already in
+                # use, instead of probing candidate names one stat at a time
+                pattern = re.compile(re.escape(self.set.suffix) + r'_(\d+)\.(?:pkl|csv)$')
+                max_n = 0
+                with os.scandir(self._service.current_folder) as entries:
+                    for entry in entries:
+                        match = pattern.match(entry.name)
+                        if match:
+                            max_n = max(max_n, int(match.group(1)))
+                n = max_n + 1
+
+                if csv == True:
+                    file_name = self.set.suffix + '_' + str(n) + '.csv'
+                else:
+                    file_name = self.set.suffix + '_' + str(n) + '.pkl'
+
                 self._service.current_file_name = self.set.suffix + '_' + str(n)
-                
+
             self._service.new_name_generated = True #only the first time I save I eventually override the override flag with new_name_generated flag
-            file_name = self._service.current_folder+file_name
+            file_name = self._service.current_folder / file_name
             flag_write = True
         
         else:
@@ -338,26 +461,31 @@ class SpaceMapping:
         
         if flag_write and csv == False:
             with open(file_name, 'wb') as f:
-                # Export general settings
-                dill.dump(self.set,f)
-                # Export database
-                dill.dump(self.data,f)
-                # Export dimensionality reduction
-                dill.dump(self.dr,f)
-                # Export service variables
-                dill.dump(self._service,f)
-                # Export maps (WARNING: have to export _maps NOT maps. The latter is generated on the fly)
-                dill.dump(self._maps,f)
+                # Export settings, database, dimensionality reduction, service
+                # variables, and maps as one length-prefixed pickle protocol-5
+                # stream, with the numpy buffers written out-of-band: much
+                # faster than generic dill dumps on numeric-heavy databases
+                # (WARNING: have to export _maps NOT maps. The latter is generated on the fly)
+                buffers = list()
+                payload = pickle.dumps((self.set, self.data, self.dr, self._service, self._maps),
+                                       protocol = 5, buffer_callback = buffers.append)
+                f.write(len(payload).to_bytes(8, 'little'))
+                f.write(payload)
+                f.write(len(buffers).to_bytes(8, 'little'))
+                for buf in buffers:
+                    view = buf.raw()
+                    f.write(len(view).to_bytes(8, 'little'))
+                    f.write(view)
                 try:
-                    # Export the study
+                    # Export the study (may hold simulator handles, keep dill)
                     dill.dump(self.study,f)
                 except:
-                    print('Study not saved, any interface open?') 
+                    print('Study not saved, any interface open?')
                 try:
-                    # Export the sampler
+                    # Export the sampler (may hold simulator handles, keep dill)
                     dill.dump(self.sampler,f)
                 except:
-                    print('Sampler not saved, any interface open?') 
+                    print('Sampler not saved, any interface open?')
        
         elif flag_write and csv == True:
             self.data.export_to_csv(file_name)
@@ -369,11 +497,21 @@ class SpaceMapping:
             response = 'y'
         if response == 'y':
             with open(file_name, 'rb') as f:
-                self.set = dill.load(f)
-                self.data = dill.load(f)
-                self.dr = dill.load(f)
-                self._service = dill.load(f)
-                self._maps = dill.load(f)
+                # Mirror of save_data: length-prefixed protocol-5 payload
+                # followed by the out-of-band numpy buffers
+                payload_len = int.from_bytes(f.read(8), 'little')
+                payload = f.read(payload_len)
+                buffers = list()
+                for _ in range(int.from_bytes(f.read(8), 'little')):
+                    buffer_len = int.from_bytes(f.read(8), 'little')
+                    # bytearray, not bytes: arrays restored from read-only
+                    # buffers reject the in-place writes add_sample relies on
+                    buffers.append(bytearray(f.read(buffer_len)))
+                (self.set, self.data, self.dr,
+                 self._service, self._maps) = pickle.loads(payload, buffers = buffers)
+                self._maps_view_cache = dict()
+                # Loaded samples are found through the linear-scan fallback
+                self._sample_index = dict()
                 try:
                     self.study = dill.load(f)
                 except:
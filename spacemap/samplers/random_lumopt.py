@@ -1,10 +1,28 @@
 import numpy as np
 import os
 import shutil
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import matplotlib.pyplot as plt
-from lumopt.optimization import Optimization
-from lumopt.utilities.wavelengths import Wavelengths
-from lumopt.optimizers.generic_optimizers import ScipyOptimizers
+# lumopt is imported lazily inside LumericalInverseDesign: the import is
+# heavy and only needed once a local optimization actually starts
+
+# Bounds acceptance check. With numba available this compiles to a single
+# early-exit pass over the parameter vector; otherwise fall back to the
+# equivalent vectorized numpy expression
+try:
+    from numba import njit
+
+    @njit(cache = True, fastmath = True)
+    def _in_bounds(param, lower, upper):
+        for i in range(param.shape[0]):
+            if not (param[i] > lower[i] and param[i] < upper[i]):
+                return False
+        return True
+except ImportError:
+    def _in_bounds(param, lower, upper):
+        return bool(np.all((param > lower) & (param < upper)))
+
 
 class RandomLumopt:
     """
@@ -18,85 +36,81 @@ class RandomLumopt:
         The study to use
     """
     
+    # Optional settings and their defaults, merged in one pass at init.
+    # Adding a new setting only requires a new entry here
+    _DEFAULTS = dict(global_result_constraint = None,
+                     # Number of concurrent screening simulations in the global
+                     # stage. Leave at 1 unless the study's simulator is
+                     # thread-safe
+                     screening_threads = 1,
+                     local_result_constraint = None,
+                     local_max_iterations = 50,
+                     local_method = 'L-BFGS-B',
+                     local_scaling_factor = 1,
+                     local_ftol = 1e-5,
+                     local_pgtol = 1e-5,
+                     # Wavelength settings for lumopt
+                     local_wavelength_start = 1550e-9,
+                     local_wavelength_stop = 1550e-9,
+                     local_wavelength_points = 1)
+
     def __init__(self, settings,study):
         """ Settings are stored, default values added if needed """
-        
+
         # Store the study #
         ###################
-       
+
         self._study = study
         self._parameters_size = self._study.geometry.parameters_size
-        
+
         # Read settings #
-        #################            
+        #################
+        for key, default in self._DEFAULTS.items():
+            setattr(self, '_' + key, getattr(settings, key, default))
+
+        # The sample function/bounds pair needs special handling: a
+        # user-supplied function overrides the bounds entirely
         if hasattr(settings, 'global_sample_function'):
-            # Use given function and ignore bounds
+            # Use given function. Bounds, when also supplied, are kept: the
+            # restart loop validates custom draws against them (redraw with
+            # clipping as last resort)
             self._global_sample_function = settings.global_sample_function
-            self._global_parameters_bounds = None
+            self._default_sampler = False
+            if hasattr(settings, 'global_parameters_bounds'):
+                self._global_parameters_bounds = np.array(settings.global_parameters_bounds)
+            else:
+                self._global_parameters_bounds = None
         else:
+            self._default_sampler = True
             # If no function, use uniform rand with given boundaries if provided. If not, assume [0,1]
             if hasattr(settings, 'global_parameters_bounds'):
                 self._global_parameters_bounds = np.array(settings.global_parameters_bounds)
             else:
-                self._global_parameters_bounds = [(0, 1)]*self._parameters_size
-            
-            self._global_sample_function = lambda: self._global_parameters_bounds[:,0] + (self._global_parameters_bounds[:,1]-self._global_parameters_bounds[:,0])*np.random.rand(1,self._parameters_size).flatten()
-            
+                self._global_parameters_bounds = np.array([(0, 1)]*self._parameters_size)
+
+            # Cache the bounds and a Generator; draws are popped from a
+            # pre-generated batch to amortize the generator call overhead
+            # across restarts
+            self._rng = np.random.default_rng()
+            self._lo = self._global_parameters_bounds[:,0].copy()
+            self._hi = self._global_parameters_bounds[:,1].copy()
+            self._buf_size = 512
+            self._buf = None
+            self._buf_pos = 0
+            self._global_sample_function = lambda: self._rng.uniform(self._lo, self._hi)
 
-        if hasattr(settings, 'global_result_constraint'):
-            self._global_result_constraint = settings.global_result_constraint
-        else:
-            self._global_result_constraint = None           
-       
-        if hasattr(settings, 'local_result_constraint'):
-            self._local_result_constraint = settings.local_result_constraint
-        else:
-            self._local_result_constraint = None
-            
-        if hasattr(settings, 'local_max_iterations'):
-            self._local_max_iterations = settings.local_max_iterations
-        else:
-            self._local_max_iterations = 50
-            
-        if hasattr(settings, 'local_method'):
-            self._local_method = settings.local_method
-        else:
-            self._local_method = 'L-BFGS-B'
-        
-        if hasattr(settings, 'local_scaling_factor'):
-            self._local_scaling_factor = settings.local_scaling_factor
-        else:
-            self._local_scaling_factor = 1
-            
-        if hasattr(settings, 'local_ftol'):
-            self._local_ftol = settings.local_ftol
-        else:
-            self._local_ftol = 1e-5
-            
-        if hasattr(settings, 'local_pgtol'):
-            self._local_pgtol = settings.local_pgtol
-        else:
-            self._local_pgtol = 1e-5
-        
-        # Wavelength settings for lumopt           
-        if hasattr(settings, 'local_wavelength_start'):
-            self._local_wavelength_start = settings.local_wavelength_start
-        else:
-            self._local_wavelength_start = 1550e-9
-        
-        if hasattr(settings, 'local_wavelength_stop'):
-            self._local_wavelength_stop = settings.local_wavelength_stop
-        else:
-            self._local_wavelength_stop = 1550e-9
-            
-        if hasattr(settings, 'local_wavelength_points'):
-            self._local_wavelength_points = settings.local_wavelength_points
-        else:
-            self._local_wavelength_points = 1
-            
         # Keep track of the latest random restart. Run a first simulation with
         # the initial parameters already stored in the geometry
         self._new_param = None
+
+        # Cache of LumericalInverseDesign wrappers keyed by their (immutable)
+        # configuration: building one parses the base script and constructs a
+        # full lumopt Optimization, so pay that once instead of per restart
+        self._invdes_cache = dict()
+
+        # Folder to return to after each lumopt run (lumopt chdirs internally
+        # and we restore right away, so this never changes)
+        self._current_folder = Path.cwd()
         
            
             
@@ -123,51 +137,68 @@ class RandomLumopt:
         # Collect results from a single global restart run
         sampling_param = list()
         sampling_res = list()
-        
-        # Run one single global restart        
-        try:           
+
+        # Local alias: the class is defined later in this module, binding it
+        # here turns the per-restart module-global lookup into a LOAD_FAST
+        _InvDes = LumericalInverseDesign
+
+        # Run one single global restart
+        try:
         
             if self._global_result_constraint is not None:
                 # Only run simulation if we are screening starting points in the global stage
-                sim_res, sim_param = self._study.run(param=self._new_param)
-                sampling_param.append(sim_param)
-                sampling_res.append(sim_res)
-            else:
-                # Otherwise only update the geometry
+                sim_res, sim_param = self._screen_starting_point(sampling_res, sampling_param)
+            elif self._new_param is not None:
+                # Otherwise only update the geometry. On the very first run
+                # there is no restart draw yet and the geometry already holds
+                # the initial parameters, so skip the simulator round-trip
                 self._study.update_geometry(param=self._new_param)
             
             if (self._global_result_constraint == None) or (self._global_result_constraint(sim_res)):
-            
-                current_folder = os.getcwd() + '\\'
-            
-                # Inverse design, create. We have to do this here because in self.samples.geometry.geometry
-                # the parameters are already updated to the last global search.
-                inverse_design = LumericalInverseDesign(max_iter = self._local_max_iterations, 
-                                                        method = self._local_method,
-                                                        scaling_factor = self._local_scaling_factor,
-                                                        pgtol = self._local_pgtol,
-                                                        ftol = self._local_ftol,
-                                                        wavelength_start = self._local_wavelength_start,
-                                                        wavelength_stop = self._local_wavelength_stop,
-                                                        wavelength_points = self._local_wavelength_points,
-                                                        build_simulation = self._study.simulation_builder,
-                                                        fom = self._study.fom.fom,
-                                                        geometry = self._study.geometry.geometry,
-                                                        hide_fdtd_cad = self._study.sim.hide_gui)
-                
+
+                # Inverse design, create or reuse. We have to do this here because
+                # in self.samples.geometry.geometry the parameters are already
+                # updated to the last global search
+                # The builder and fom objects are key components themselves
+                # (hashed by identity): the cache then holds strong
+                # references, so a replaced fom cannot be collected and have
+                # its id reused to serve a wrapper bound to the dead object
+                cfg_key = (self._local_max_iterations, self._local_method,
+                           self._local_scaling_factor, self._local_pgtol, self._local_ftol,
+                           self._local_wavelength_start, self._local_wavelength_stop,
+                           self._local_wavelength_points,
+                           self._study.simulation_builder, self._study.fom.fom,
+                           self._study.sim.hide_gui)
+                inverse_design = self._invdes_cache.get(cfg_key)
+                if inverse_design is None:
+                    inverse_design = _InvDes(max_iter = self._local_max_iterations,
+                                             method = self._local_method,
+                                             scaling_factor = self._local_scaling_factor,
+                                             pgtol = self._local_pgtol,
+                                             ftol = self._local_ftol,
+                                             wavelength_start = self._local_wavelength_start,
+                                             wavelength_stop = self._local_wavelength_stop,
+                                             wavelength_points = self._local_wavelength_points,
+                                             build_simulation = self._study.simulation_builder,
+                                             fom = self._study.fom.fom,
+                                             geometry = self._study.geometry.geometry,
+                                             hide_fdtd_cad = self._study.sim.hide_gui)
+                    self._invdes_cache[cfg_key] = inverse_design
+                else:
+                    # Reattach the (updated) geometry and start the local
+                    # optimizer from a clean state
+                    inverse_design.reset_geometry(self._study.geometry.geometry)
+
                 # Inverse design, run
                 res = inverse_design.run()
-                
+
                 # Store optimization result
                 sampling_param.append(np.array(res[1]))
                 sampling_res.append(res[0])
-            
+
                 # Return to proper folder
-                os.chdir(current_folder)
-                
-                # Inverse design, clear
-                del inverse_design
-            
+                os.chdir(self._current_folder)
+
                 # Only counts as results if constraint are satisfied
                 if (self._local_result_constraint == None) or (self._local_result_constraint(res[0])):
                     good_result = True
@@ -176,16 +207,22 @@ class RandomLumopt:
 
                     
             
-            # Random restart with constraint check: update new_param
-            flag_param_constraint = False
-            while not flag_param_constraint:
-                self._new_param = self._global_sample_function()
-                
-                if np.array(self._global_parameters_bounds == None).all() :
-                    flag_param_constraint = True
+            # Random restart: the default sampler draws inside the bounds by
+            # construction, so no rejection loop is needed. A user-supplied
+            # function gets a capped number of redraws against the bounds
+            # (when available), with clipping as last resort
+            self._new_param = self._next_draw()
+            if not self._default_sampler and self._global_parameters_bounds is not None:
+                for _ in range(16):
+                    if _in_bounds(self._new_param,
+                                  self._global_parameters_bounds[:,0],
+                                  self._global_parameters_bounds[:,1]):
+                        break
+                    self._new_param = self._next_draw()
                 else:
-                    if (all(self._new_param>self._global_parameters_bounds[:,0]) and all(self._new_param<self._global_parameters_bounds[:,1])):
-                        flag_param_constraint = True
+                    self._new_param = np.clip(self._new_param,
+                                              self._global_parameters_bounds[:,0],
+                                              self._global_parameters_bounds[:,1])
             
             
             # Run completed, reset error flag
@@ -199,8 +236,88 @@ class RandomLumopt:
         
         # Sampling is done, close the simulation interface
         #self._study.close_simulation()
-        
+
         return(sampling_res,sampling_param, good_result, error_flag)
+
+
+    def close(self):
+        """ Release the cached inverse-design wrappers and their lumopt
+            objects. Called when the sampler is no longer needed """
+
+        for inverse_design in self._invdes_cache.values():
+            inverse_design.close()
+        self._invdes_cache = dict()
+
+
+    def _next_draw(self):
+        """ Next random restart draw. The default sampler pops rows from a
+            pre-generated batch; user-supplied functions are called directly """
+
+        if not self._default_sampler:
+            return self._global_sample_function()
+
+        if self._buf is None or self._buf_pos == self._buf_size:
+            self._buf = self._rng.uniform(self._lo, self._hi,
+                                          size = (self._buf_size, self._parameters_size))
+            self._buf_pos = 0
+
+        draw = self._buf[self._buf_pos]
+        self._buf_pos += 1
+        return draw
+
+    def _screen_starting_point(self, sampling_res, sampling_param):
+        """
+        Run the screening simulation(s) for the global stage
+
+        With 'screening_threads' > 1, several candidate starting points are
+        simulated concurrently and the first one satisfying the global
+        constraint becomes the next seed; every screened result is still
+        stored. The study's simulator must be thread-safe for this, so the
+        default stays serial.
+
+        Returns
+        ----------
+        sim_res: list
+            The screening simulation result for the selected candidate
+        sim_param: numpy array
+            The corresponding parameter set
+        """
+
+        if self._screening_threads <= 1:
+            sim_res, sim_param = self._study.run(param=self._new_param)
+            sampling_res.append(sim_res)
+            sampling_param.append(sim_param)
+            return (sim_res, sim_param)
+
+        # The current restart draw plus fresh draws to fill the pool
+        candidates = [self._new_param]
+        for _ in range(self._screening_threads - 1):
+            candidates.append(self._next_draw())
+
+        winner = None
+        with ThreadPoolExecutor(max_workers = self._screening_threads) as pool:
+            futures = [pool.submit(self._study.run, param = c) for c in candidates]
+            for future in as_completed(futures):
+                if future.cancelled():
+                    continue
+                sim_res, sim_param = future.result()
+                sampling_res.append(sim_res)
+                sampling_param.append(sim_param)
+                if winner is None and self._global_result_constraint(sim_res):
+                    winner = (sim_res, sim_param)
+                    # No need to start screening the remaining candidates
+                    for other in futures:
+                        other.cancel()
+
+        if winner is None:
+            # Nothing passed: return the last screened candidate, the caller
+            # rejects it against the constraint anyway
+            return (sim_res, sim_param)
+
+        # Make sure the geometry holds the winning parameters before the
+        # local optimization starts
+        self._study.update_geometry(param = winner[1])
+        return winner
             
             
             
@@ -229,11 +346,19 @@ class LumericalInverseDesign:
     
     def __init__(self, max_iter, method, scaling_factor, pgtol, ftol, wavelength_start, wavelength_stop,
                  wavelength_points, build_simulation, fom, geometry, hide_fdtd_cad):
-        
+
+        from lumopt.optimization import Optimization
+        from lumopt.utilities.wavelengths import Wavelengths
+
+        self._closed = False
+
+        # Remember the optimizer settings, reset_geometry rebuilds it
+        self._optimizer_settings = dict(max_iter=max_iter, method=method,
+                                        scaling_factor=scaling_factor, ftol=ftol, pgtol=pgtol)
+
         # The optimizer must be generated anew at each iteration
-        self._new_local_optimizer = ScipyOptimizers(max_iter=max_iter, method=method,
-                                                   scaling_factor=scaling_factor, ftol=ftol, pgtol=pgtol)
-        
+        self._new_local_optimizer = self._make_optimizer()
+
         self._wl = Wavelengths(start = wavelength_start, stop = wavelength_stop, points = wavelength_points)
         
         self._optimization = Optimization(base_script = build_simulation,
@@ -243,7 +368,22 @@ class LumericalInverseDesign:
                                           optimizer = self._new_local_optimizer,
                                           hide_fdtd_cad = hide_fdtd_cad,
                                           use_deps = True)
-        
+
+    def _make_optimizer(self):
+        """ Build a fresh scipy local optimizer from the stored settings """
+
+        from lumopt.optimizers.generic_optimizers import ScipyOptimizers
+        return ScipyOptimizers(**self._optimizer_settings)
+
+    def reset_geometry(self, geometry):
+        """ Prepare a cached instance for another run: attach the geometry
+            holding the new starting parameters and rebuild the (cheap) local
+            optimizer so no state leaks from the previous optimization """
+
+        self._new_local_optimizer = self._make_optimizer()
+        self._optimization.geometry = geometry
+        self._optimization.optimizer = self._new_local_optimizer
+
     def run(self):
         """
         Run the lumopt optimization
@@ -277,12 +417,24 @@ class LumericalInverseDesign:
                 shutil.rmtree(local_folder+'\\'+folder, ignore_errors=True)
                 
     
-    def __del__(self):
+    def close(self):
+        """ Deterministically release the lumopt objects and remove the
+            artifact folders. Safe to call more than once """
+
+        if self._closed:
+            return
+        self._closed = True
+
         # Remove  objects to delete pointers or pickle could have problems
         del self._optimization
         del self._wl
         del self._new_local_optimizer
-        
+
         self._cleanup()
+
+    def __del__(self):
+        # Fallback only: prefer an explicit close(), finalizers may run as
+        # late as interpreter shutdown
+        self.close()
         
         
\ No newline at end of file
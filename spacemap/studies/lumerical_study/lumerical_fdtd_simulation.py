@@ -1,6 +1,33 @@
-import lumapi
-from lumopt.utilities.load_lumerical_scripts import load_from_lsf
+# lumapi and lumopt are imported lazily (license check and DLL load make
+# them expensive, and runtimes without Lumerical can still import the module)
+import inspect
 import os
+import weakref
+
+
+# Callable arity, computed once per function object: signature inspection is
+# far too slow to repeat on every execute() call
+_arity_cache = weakref.WeakKeyDictionary()
+
+
+def _callable_arity(obj):
+    """ Number of parameters obj accepts (memoized) """
+    try:
+        return _arity_cache[obj]
+    except (KeyError, TypeError):
+        pass
+    try:
+        arity = len(inspect.signature(obj).parameters)
+    except (TypeError, ValueError):
+        # builtins without introspectable signatures: assume they take
+        # the simulator handle
+        arity = 1
+    try:
+        _arity_cache[obj] = arity
+    except TypeError:
+        pass
+    return arity
+
 
 class LumericalFDTD():
     """
@@ -24,6 +51,14 @@ class LumericalFDTD():
     def __init__(self, working_dir, hide_gui):
         self._working_dir = working_dir
         self.hide_gui = hide_gui
+        # Parsed .lsf scripts keyed by (path, mtime): a sweep loads the same
+        # builder script thousands of times, re-reading it each run is wasted
+        # io. The mtime in the key invalidates stale entries automatically
+        self._script_cache = dict()
+        # Memoized file-existence checks for execute() string dispatch,
+        # scoped to this session and dropped on close() so files created or
+        # removed between sessions are picked up again
+        self._isfile_cache = dict()
         
    
     def __del__(self):
@@ -32,6 +67,8 @@ class LumericalFDTD():
     
     def initialize(self, build_simulation):
         """ Launches FDTD CAD and stores the handle """
+        import lumapi
+
         # lumopt objects expect self.fdtd to be a lumapi.FDTD handle
         self.fdtd = lumapi.FDTD(hide = self.hide_gui)
         self.fdtd.cd(self._working_dir)
@@ -53,18 +90,28 @@ class LumericalFDTD():
         """
         
         if callable(obj):
-            try:    
-                # assume it is a lumapi code, execute passing the lumapi handle
-                exec_res = obj(self.fdtd)
-            except:
-                # does not take arguments, assume it returns a string to evaluate
-                exec_res = self.execute(obj())
-            finally:
-                return exec_res
+            # Dispatch on arity instead of try/except probing: the old
+            # pattern paid exception setup on every call and a bare except
+            # swallowed real simulator errors
+            if _callable_arity(obj) == 0:
+                # does not take arguments: it returns a string to evaluate
+                return self.execute(obj())
+            # lumapi code, execute passing the lumapi handle
+            return obj(self.fdtd)
         elif isinstance(obj, str):
-            # check if the string is a file
+            # A multi-line or ';'-terminated string cannot be a file name:
+            # evaluate it directly without paying the stat syscall
+            if '\n' in obj or ';' in obj:
+                self._script_eval(obj)
+                return
+            # check if the string is a file (existence check is memoized
+            # for the lifetime of the session)
             full_path_file = os.path.abspath(self._working_dir+obj)
-            if not os.path.isfile(full_path_file):
+            is_file = self._isfile_cache.get(full_path_file)
+            if is_file is None:
+                is_file = os.path.isfile(full_path_file)
+                self._isfile_cache[full_path_file] = is_file
+            if not is_file:
                 # Evaluate a Lumerical script if a string is passed
                 self._script_eval(obj)
             else:
@@ -86,7 +133,12 @@ class LumericalFDTD():
         if '.fsp' in file and os.path.isfile(file):
            self.fdtd.load(file)
         elif '.lsf' in file and os.path.isfile(file):
-            script_str = load_from_lsf(file)
+            cache_key = (file, os.path.getmtime(file))
+            script_str = self._script_cache.get(cache_key)
+            if script_str is None:
+                from lumopt.utilities.load_lumerical_scripts import load_from_lsf
+                script_str = load_from_lsf(file)
+                self._script_cache[cache_key] = script_str
             self._script_eval(script_str)
         else:
             raise UserWarning('Input file must be either .fsp or .lsf')
@@ -95,16 +147,58 @@ class LumericalFDTD():
     def run(self, name):
         """
         Saves simulation file and run the simulation
-        
+
         Params
         -------
         name: string
             Name for the fsp file
-        
+
         """
-             
+
         self.fdtd.save('{}'.format(name))
         self.fdtd.run()
+
+    def add_job(self, name):
+        """
+        Saves the simulation file and queue it in the Lumerical job manager
+
+        Params
+        -------
+        name: string
+            Name for the fsp file
+
+        """
+
+        self.fdtd.save('{}'.format(name))
+        self.fdtd.addjob(name)
+
+    def run_jobs(self, capacity=None):
+        """
+        Run all queued jobs, concurrently up to the configured capacity
+
+        Params
+        -------
+        capacity: int, None
+            Number of jobs the resource manager may run at once. If None
+            the current Lumerical setting is kept
+
+        """
+
+        if capacity is not None:
+            try:
+                # Documented form: resource name, resource index, property
+                self.fdtd.setresource("FDTD", 1, "capacity", capacity)
+            except Exception as e:
+                # Resource naming differs between Lumerical versions, keep
+                # the configured default rather than failing the batch
+                print("Could not set job capacity: ", end="")
+                print(e)
+        self.fdtd.runjobs()
+
+    def load_job(self, name):
+        """ Load a solved fsp file queued through add_job """
+
+        self.fdtd.load(name)
     
     def close(self):
         """ Close the simulator and delete the handle """ 
@@ -114,3 +208,7 @@ class LumericalFDTD():
             # Must clear the object to remove pointers or pickle does not work
             del self.fdtd
 
+        # Forget the file-existence checks so the next session re-detects
+        # scripts created or removed in the meantime
+        self._isfile_cache.clear()
+
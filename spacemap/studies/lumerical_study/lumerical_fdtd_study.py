@@ -1,9 +1,17 @@
+import hashlib
+import pickle
 import numpy as np
 import os
 from .lumerical_geometry import LumericalGeometryObject
 from .lumerical_fom import LumericalFomObject
 from .lumerical_fdtd_simulation import LumericalFDTD
 
+
+def _always_true(x):
+    """ Default geometry/fom placeholder """
+    return True
+
+
 class LumericalFDTDStudy:
     """
     Define a study based on lumopt and lumapi
@@ -35,57 +43,32 @@ class LumericalFDTDStudy:
         """ Settings are stored, default values added if needed """
         
         current_folder = os.getcwd() + '\\'
-        
+
         # Read settings #
         #################
-    
-        if hasattr(settings, 'initial_parameters'):
-            initial_parameters = settings.initial_parameters
-        else:
-            initial_parameters = None
-            
-        if hasattr(settings, 'parameters_name'):
-            self.parameters_name = settings.parameters_name
-        else:
-            self.parameters_name = None
-            
-        if hasattr(settings, 'geometry_function'):
-            geometry_function = settings.geometry_function
-        else:
-            geometry_function = lambda x: True
-        
-        if hasattr(settings, 'fom_name'):
-            self.fom_name = settings.fom_name
-        else:
-            self.fom_name = 'fom'
-        
-        if hasattr(settings, 'fom_function'):
-            fom_function = settings.fom_function
-        else:
-            fom_function = lambda x: True
-                
-        if hasattr(settings, 'simulation_folder'):
-            simulation_folder = settings.simulation_folder
-        else:
-            simulation_folder = ''
-            
+        # One getattr with a default per field, no per-field hasattr probing
+
+        initial_parameters = getattr(settings, 'initial_parameters', None)
+        self.parameters_name = getattr(settings, 'parameters_name', None)
+        geometry_function = getattr(settings, 'geometry_function', _always_true)
+        self.fom_name = getattr(settings, 'fom_name', 'fom')
+        fom_function = getattr(settings, 'fom_function', _always_true)
+        hide_gui = getattr(settings, 'hide_gui', False)
+        # Keep the session alive between runs by default: spawning the FDTD
+        # process and re-running the build script dominates the per-sample
+        # time for small sweeps
+        self._simulator_restart = getattr(settings, 'simulator_restart', False)
+        self.simulation_builder = getattr(settings, 'simulation_builder', None)
+        # Preferred number of points per run_batch call; samplers probe this
+        # attribute to size their blocks and the job queue runs up to this
+        # many simulations concurrently
+        self.batch_size = getattr(settings, 'batch_size', 8)
+        # Optional file to persist the result cache across sessions
+        self._result_cache_file = getattr(settings, 'result_cache_file', None)
+
+        simulation_folder = getattr(settings, 'simulation_folder', '')
         if simulation_folder == '':
             simulation_folder = current_folder
-            
-        if hasattr(settings, 'hide_gui'):
-            hide_gui = settings.hide_gui
-        else:
-            hide_gui = False
-        
-        if hasattr(settings, 'simulator_restart'):
-            self._simulator_restart = settings.simulator_restart
-        else:
-            self._simulator_restart = True
-        
-        if hasattr(settings, 'simulation_builder'):
-            self.simulation_builder = settings.simulation_builder
-        else:
-            self.simulation_builder = None
         
         # File name to save fsp file before simulation
         self._file_name=file_name
@@ -94,6 +77,9 @@ class LumericalFDTDStudy:
         ########################
         self.sim = LumericalFDTD(simulation_folder, hide_gui)
         self._sim_initialized = False
+        # Identity of the builder the live session was initialized with; a
+        # different builder forces a re-initialization
+        self._builder_fingerprint = None
         
         # Define the problem #
         ######################      
@@ -103,17 +89,35 @@ class LumericalFDTDStudy:
         
         # FOM
         self.fom = LumericalFomObject(fom_function, self.sim)
-        
+
+        # Memoized run() results keyed by parameter vector and fom name: an
+        # FDTD solve costs seconds to minutes, a repeated parameter set
+        # (initial points, grid corners, restarts) costs a dict lookup
+        self._result_cache = dict()
+        if self._result_cache_file is not None and os.path.isfile(self._result_cache_file):
+            try:
+                with open(self._result_cache_file, 'rb') as cache_file:
+                    self._result_cache = pickle.load(cache_file)
+            except Exception as e:
+                print("Result cache not loaded: ", end="")
+                print(e)
+
 
             
-    def run(self, param=None):
+    def run(self, param=None, force_restart=False, skip_cache=False):
         """ Run a simulation and return the results
-        
+
         Parameters
         ----------
         param: array, None
             The input parameters used for the simulation. If None, the simulation
             run without updtaing the geometry
+        force_restart: bool
+            Close the simulator interface after this run even if the study
+            keeps the session alive
+        skip_cache: bool
+            Run the simulation even if a memoized result exists for these
+            parameters (the fresh result replaces the cached one)
 
         Returns
         -------
@@ -121,21 +125,107 @@ class LumericalFDTDStudy:
             The simulation result
         used_parameters: list
             The parameters used for the simulation (useful if param=None)
-        
+
         """
-        
+
+        # Cached result? Only parameterized runs are memoized, a param=None
+        # run depends on whatever geometry state the simulator holds
+        cache_key = None
+        if param is not None:
+            cache_key = self._cache_key(param)
+            if not skip_cache and cache_key in self._result_cache:
+                return self._result_cache[cache_key]
+
         # Error handling is not done here but in the sampler class
         self._initialize_simulation()
         if param is not None:
-            self.geometry.update(param = np.array(param).flatten(), update = 1, push_change = True)
+            # ascontiguousarray does not copy when the input already is a
+            # contiguous float array
+            self.geometry.update(param = np.ascontiguousarray(param, dtype=np.float64).ravel(),
+                                 update = 1, push_change = True)
         self.sim.run(self._file_name)
         res = self.fom.get()
-        if self._simulator_restart:
+        if self._simulator_restart or force_restart:
             self.close_simulation()
-        
+
+        # Never memoize the failure sentinel, a failed point must stay
+        # retryable
+        if cache_key is not None and res is not False:
+            self._result_cache[cache_key] = (res, self.geometry.parameters)
+
         # Return the simulation result and the used parameters (useful
         # if param=None)
         return (res, self.geometry.parameters)
+
+    def run_batch(self, params_list, n_jobs=None):
+        """ Run a batch of simulations through the Lumerical job queue
+
+        All geometry variants are saved and queued first, then solved with a
+        single runjobs call so the resource manager can run them
+        concurrently, instead of one blocking run per point.
+
+        Parameters
+        ----------
+        params_list: list
+            The parameter sets to simulate, one array per point
+        n_jobs: int, None
+            Number of concurrent jobs. Defaults to batch_size
+
+        Returns
+        -------
+        res_list: list
+            The simulation result for each point, in input order
+        used_params: list
+            The parameters used for each simulation
+
+        """
+
+        if n_jobs is None:
+            n_jobs = self.batch_size
+
+        res_list = [None] * len(params_list)
+        used_params = [None] * len(params_list)
+        jobs = list()
+
+        self._initialize_simulation()
+
+        # Queue the uncached points
+        for idx, param in enumerate(params_list):
+            param = np.ascontiguousarray(param, dtype=np.float64).ravel()
+            used_params[idx] = param
+            cache_key = self._cache_key(param)
+            cached = self._result_cache.get(cache_key)
+            if cached is not None:
+                res_list[idx] = cached[0]
+                continue
+            self.geometry.update(param = param, update = 1, push_change = True)
+            job_file = '{}_batch{}.fsp'.format(self._file_name, idx)
+            self.sim.add_job(job_file)
+            jobs.append((idx, job_file, cache_key))
+
+        # Solve them all in one shot, then collect the foms
+        if len(jobs) > 0:
+            self.sim.run_jobs(capacity = n_jobs)
+            for idx, job_file, cache_key in jobs:
+                self.sim.load_job(job_file)
+                res = self.fom.get()
+                res_list[idx] = res
+                if res is not False:
+                    self._result_cache[cache_key] = (res, used_params[idx])
+
+        return res_list, used_params
+
+    def _cache_key(self, param):
+        """ Digest identifying a parameter set/fom pair """
+        return hashlib.blake2b(np.ascontiguousarray(param, dtype=np.float64).tobytes()
+                               + self.fom_name.encode()).digest()
+
+    def save_result_cache(self):
+        """ Persist the memoized results, if a cache file is configured """
+
+        if self._result_cache_file is not None:
+            with open(self._result_cache_file, 'wb') as cache_file:
+                pickle.dump(self._result_cache, cache_file)
     
     
     def update_geometry(self, param=None):
@@ -153,7 +243,8 @@ class LumericalFDTDStudy:
         
         """
         if param is not None:
-            self.geometry.update(param=np.array(param).flatten(), update = 1, push_change = False)
+            self.geometry.update(param=np.ascontiguousarray(param, dtype=np.float64).ravel(),
+                                 update = 1, push_change = False)
             res = True
         else:
             res = False
@@ -175,35 +266,45 @@ class LumericalFDTDStudy:
         
         self.fom = LumericalFomObject(fom_function, self.sim)
         self.fom_name = fom_name
+        # A new fom function may reuse an old name, drop the memoized results
+        self._result_cache = dict()
         print("New figure of merit: " + fom_name)
         
     
     def close_simulation(self):
         """ Close simulation interface """
-        
+
         if self._sim_initialized == True:
-            
+
             # Close the simulator interface
             self.sim.close()
-        
+
             # Flag not initialized
             self._sim_initialized = False
+
+        # Good moment to persist the memoized results
+        self.save_result_cache()
  
     
     def _initialize_simulation(self):
         """ Initialize simulation interface """
-        
+
+        # A live session built from a different builder must be rebuilt
+        if self._sim_initialized and self._builder_fingerprint != id(self.simulation_builder):
+            self.close_simulation()
+
         if self._sim_initialized == False:
             # simulation initilization
             self.sim.initialize(self.simulation_builder)
-            
+
             # Initialize the geometry (add it to the simulation)
             self.geometry.initialize()
-            
+
             # Initialize fom (required for lumopt)
             self.fom.initialize()
-            
+
             # Flag initialized
+            self._builder_fingerprint = id(self.simulation_builder)
             self._sim_initialized = True
     
 
@@ -1,5 +1,3 @@
-from lumopt.figures_of_merit.modematch import ModeMatch
-
 class LumericalFomObject:
     """
     Class to abstract different types of figure of merit definitions that
@@ -19,18 +17,31 @@ class LumericalFomObject:
     """
     
     def __init__(self, fom_obj, ha):
-        
+
         self._ha = ha
-        if isinstance(fom_obj,ModeMatch):
+        # lumopt is imported lazily so constructing a study is cheap and
+        # runtimes without Lumerical can still use function foms
+        try:
+            from lumopt.figures_of_merit.modematch import ModeMatch
+        except ImportError:
+            ModeMatch = None
+        if ModeMatch is not None and isinstance(fom_obj,ModeMatch):
             self.fom = fom_obj
             self._fom_type = 'ModeMatch'
         else:
             # Function can include either a lumapi code or return a string
-            # (lumerical script to execute). This cases are handled by the 
+            # (lumerical script to execute). This cases are handled by the
             # Simulation class
             self.fom = fom_obj
             self._fom_type = 'function'
-    
+
+        # Bind the fetch implementation once: get() is called after every
+        # simulation and needs no per-call type dispatch
+        if self._fom_type == 'ModeMatch':
+            self._get_impl = self._get_modematch
+        else:
+            self._get_impl = self._get_function
+
     
     def initialize(self):
         """ Initialize the figure of merit """
@@ -53,10 +64,13 @@ class LumericalFomObject:
         
         """
         
-        if self._fom_type == 'function':
-            # It is a function with no parameters, just run it
-#            return self.fom(self.ha.fdtd.handle)
-            return self._ha.execute(self.fom)
-        elif self._fom_type == 'ModeMatch':
-            # It is a lumopt.figures_of_merit.modematch object
-            return self.fom.get_fom(self._ha)
\ No newline at end of file
+        return self._get_impl()
+
+    def _get_function(self):
+        """ Run the fom function through the simulator interface """
+#        return self.fom(self.ha.fdtd.handle)
+        return self._ha.execute(self.fom)
+
+    def _get_modematch(self):
+        """ Fetch the fom from the lumopt ModeMatch object """
+        return self.fom.get_fom(self._ha)
\ No newline at end of file
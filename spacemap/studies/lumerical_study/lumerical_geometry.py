@@ -1,5 +1,4 @@
-from lumopt.geometries.polygon import FunctionDefinedPolygon
-from lumopt.geometries.parameterized_geometry import ParameterizedGeometry
+import inspect
 import numpy as np
 
 class LumericalGeometryObject:
@@ -10,7 +9,11 @@ class LumericalGeometryObject:
         Parameters
         ----------
         geom_obj: function, object
-            The object defining the geometry
+            The object defining the geometry. A plain function can either
+            take (fdtd, param) and build the geometry through the passed
+            lumapi handle (parameters are also available in the Lumerical
+            workspace as 'spacemap_params'), or take the parameter array
+            alone and be dispatched through the Simulation class
         initial_param: array
             Initial set of parameters (only used if geom_obj is a function handle)
         ha: object
@@ -30,17 +33,40 @@ class LumericalGeometryObject:
             1D array of strings with parameters names
     """
     
+    # Lumopt geometry classes, resolved lazily on first construction:
+    # importing lumopt is slow and runtimes without Lumerical can still
+    # use function-defined geometries
+    _LUMOPT_GEOM_TYPES = None
+
+    @classmethod
+    def _lumopt_geom_types(cls):
+        """ Import and cache the lumopt geometry classes """
+
+        if cls._LUMOPT_GEOM_TYPES is None:
+            try:
+                from lumopt.geometries.polygon import FunctionDefinedPolygon
+                from lumopt.geometries.parameterized_geometry import ParameterizedGeometry
+                cls._LUMOPT_GEOM_TYPES = dict(FunctionDefinedPolygon = FunctionDefinedPolygon,
+                                              ParameterizedGeometry = ParameterizedGeometry)
+            except ImportError:
+                cls._LUMOPT_GEOM_TYPES = dict()
+        return cls._LUMOPT_GEOM_TYPES
+
     def __init__(self,geom_obj, initial_param, ha, parameters_name):
-        
+
         # Simulation handle
         self._ha = ha
 
-        if isinstance(geom_obj,FunctionDefinedPolygon):
+        geom_types = self._lumopt_geom_types()
+        FunctionDefinedPolygon = geom_types.get('FunctionDefinedPolygon')
+        ParameterizedGeometry = geom_types.get('ParameterizedGeometry')
+
+        if FunctionDefinedPolygon is not None and isinstance(geom_obj,FunctionDefinedPolygon):
             self.geometry = geom_obj
             self.parameters = np.array(self.geometry.get_current_params())
             self.parameters_size = np.size(self.parameters)
             self._geometry_type = 'FunctionDefinedPolygon'
-        elif isinstance(geom_obj,ParameterizedGeometry):
+        elif ParameterizedGeometry is not None and isinstance(geom_obj,ParameterizedGeometry):
             self.geometry = geom_obj
             self.parameters = np.array(self.geometry.get_current_params())
             self.parameters_size = np.size(self.parameters)
@@ -50,11 +76,25 @@ class LumericalGeometryObject:
             # (lumerical script to execute). This cases are handled by the 
             # Simulation class 
             self._geometry_function = geom_obj
-            # real geometry is created once the first set of parameters is provided
-            self.geometry = lambda: self._geometry_function(np.array(initial_param))
+            # A function taking (fdtd, param) receives the simulator handle
+            # and the whole parameter vector at once: the recommended contract,
+            # the geometry can be pushed with a single putv + eval round-trip.
+            # Legacy single-argument functions keep going through execute()
+            try:
+                n_args = len(inspect.signature(geom_obj).parameters)
+            except (TypeError, ValueError):
+                n_args = 1
+            self._geometry_takes_fdtd = n_args >= 2
             self.parameters = np.array(initial_param)
             self.parameters_size = np.size(self.parameters)
             self._geometry_type = 'function'
+            # Parameter buffer allocated once and refilled in place by
+            # update(): no function object, closure cell or array allocation
+            # per call. The geometry is the persistent _run_geom bound method
+            self._current_param = np.empty(self.parameters_size, dtype=np.float64)
+            if initial_param is not None:
+                np.copyto(self._current_param, self.parameters.flatten())
+            self.geometry = self._run_geom
             
         # Store parameters names
         if parameters_name == None:
@@ -65,6 +105,13 @@ class LumericalGeometryObject:
         else:
             self.parameters_name = parameters_name
 
+    def _run_geom(self):
+        """ Invoke the user geometry function with the current parameters """
+
+        if self._geometry_takes_fdtd:
+            return self._geometry_function(self._ha.fdtd, self._current_param)
+        return self._geometry_function(self._current_param)
+
     def initialize(self):
         """ Initialize the geometry """
         
@@ -86,40 +133,64 @@ class LumericalGeometryObject:
         
         """
         
-        # Check if parameters are passed
-        param_flag = not np.array(param==None).any()
-        
+        # Check if parameters are passed. Identity check only: 'param==None'
+        # on an array allocates and compares elementwise
+        param_flag = param is not None
+        if param_flag:
+            # One conversion shared by every branch; no copy when the caller
+            # already passes a contiguous float array
+            param = np.ascontiguousarray(param, dtype=np.float64).ravel()
+
         if self._geometry_type == 'function':
-            # Update stored parameters if param_flag=True
+            # Update stored parameters if param_flag=True: the preallocated
+            # buffer is refilled in place, nothing is rebuilt per call
             if param_flag:
-                self.geometry = lambda: self._geometry_function(np.array(param))
-                self.parameters = np.array(param)
-            
+                if param.shape[0] != self._current_param.shape[0]:
+                    # A geometry built without initial parameters learns its
+                    # size on the first real update
+                    self._current_param = param.copy()
+                    self.parameters_size = param.shape[0]
+                else:
+                    np.copyto(self._current_param, param)
+                self.parameters = param
+
             if push_change:
-                self._ha.execute(self.geometry)
+                if self._geometry_takes_fdtd:
+                    # Push the whole parameter vector in one putv, then let
+                    # the user function build/update the geometry: one IPC
+                    # round-trip instead of one per parameter
+                    self._ha.fdtd.putv('spacemap_params', self._current_param)
+                    self._geometry_function(self._ha.fdtd, self._current_param)
+                else:
+                    # self.geometry holds the bound method created once in
+                    # __init__ (accessing self._run_geom here would build a
+                    # fresh method object per call)
+                    self._ha.execute(self.geometry)
         elif self._geometry_type == 'FunctionDefinedPolygon':
             # Update stored parameters if param_flag=True
             if param_flag:
-                self.geometry.update_geometry(np.array(param))
-            
+                self.geometry.update_geometry(param)
+
             new_params = self.geometry.get_current_params()
-            self.parameters = np.array(new_params)
-            
+            self.parameters = np.asarray(new_params)
+
             if push_change:
                 self.geometry.add_geo(self._ha, new_params, update)
-                
+
         elif self._geometry_type == 'ParameterizedGeometry':
             # Update stored parameters if param_flag=True
             if param_flag:
-                self.geometry.update_geometry(np.array(param), self._ha)
-            
+                self.geometry.update_geometry(param, self._ha)
+
             new_params = self.geometry.get_current_params()
-            self.parameters = np.array(new_params)
-            
+            self.parameters = np.asarray(new_params)
+
             if push_change:
                 self.geometry.add_geo(self._ha, new_params, update)
-            
-        self.parameters_size = np.size(self.parameters)
+
+        # parameters_size is set in __init__ and corrected by the resize
+        # branch above when the true size is only learned on the first
+        # update; no unconditional recomputation per call
         
         
 
@@ -1,10 +1,39 @@
 import numpy as np
 import csv
 
+# Fused filter kernel. With numba available the result-name match and both
+# bound checks run in one parallel pass over the results block with no
+# boolean temporaries; otherwise filtering stays on the numpy mask path
+try:
+    from numba import njit, prange
+
+    @njit(cache = True, parallel = True)
+    def _bounds_kernel(block, name_ids, target_id, lb, ub, use_lb, use_ub):
+        n = block.shape[0]
+        m = block.shape[1]
+        mask = np.empty(n, dtype=np.bool_)
+        for i in prange(n):
+            ok = name_ids[i] == target_id
+            if ok and use_lb:
+                for j in range(m):
+                    if not (block[i, j] > lb[j]):
+                        ok = False
+                        break
+            if ok and use_ub:
+                for j in range(m):
+                    if not (block[i, j] < ub[j]):
+                        ok = False
+                        break
+            mask[i] = ok
+        return mask
+except ImportError:
+    _bounds_kernel = None
+
+
 class Sample:
     """
         Class to store a single simulation sample
-        
+
         Parameters
         ----------
         parameters: array
@@ -15,7 +44,7 @@ class Sample:
             The results generated by the simulation
         result_name: str
             A name for the function that generated the result
-        
+
         Attributes
         ----------
         parameters: numpy array
@@ -23,7 +52,7 @@ class Sample:
         parameters_size: int
             Number of parameters
         simulation_name: str
-            Name of the simulation stage that generated the result  
+            Name of the simulation stage that generated the result
         result:list
             The results generated by the simulation
         result_size: int
@@ -32,11 +61,13 @@ class Sample:
             A name for the function that generated the result
     """
     def __init__(self, parameters, simulation_name, result, result_name):
-        self.parameters = np.array(parameters).flatten()
+        # Fix the dtype once at ingress: everything downstream (matrices,
+        # index keys, kernels) works on contiguous float64 without re-casting
+        self.parameters = np.ascontiguousarray(parameters, dtype=np.float64).reshape(-1)
         self.parameters_size = self.parameters.shape[0]
-        
+
         self.simulation_name = simulation_name
-        
+
         #if result is not a list, make it a list
         if (type(result)!=list):
             result_to_store = [result]
@@ -45,47 +76,122 @@ class Sample:
         self.result = result_to_store
         self.result_size = len(self.result)
         self.result_name = result_name
-        
-        
-    
+
+
+
+
+class _SampleSequence:
+    """
+        Sequence facade over the columnar store of a DataCollection.
+
+        Sample objects are built lazily on access, so the database holds
+        contiguous matrices and plain lists instead of one Python object
+        (plus its own ndarray and list) per sample.
+    """
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    def __len__(self):
+        return self._collection.sample_num
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self._collection._make_sample(i)
+                    for i in range(*idx.indices(self._collection.sample_num))]
+        if idx < 0:
+            idx += self._collection.sample_num
+        return self._collection._make_sample(idx)
+
+    def __iter__(self):
+        for i in range(self._collection.sample_num):
+            yield self._collection._make_sample(i)
+
 
 class DataCollection:
     """
         Class to store the information about the optimization,
         parameters, geometry, and figure of merit.
-        
+
         Attributes
         ----------
-        sample: list
-            List of 'Sample' object, one for each entry
+        sample: sequence
+            Per-sample view of the database, one 'Sample' object per entry
         sample_num: int
-            Number of entries   
+            Number of entries
         current_sample: obj
             Points to sample[-1]
+
+        Notes
+        -----
+        The samples are stored column-wise (structure of arrays): contiguous
+        parameter/result matrices next to plain lists for the names and the
+        original result lists. 'sample[i]' materializes a lightweight Sample
+        view on demand, so fetching many samples is a single fancy-index and
+        N samples do not cost N Python objects. The numeric matrices are only
+        maintained while every sample has the same parameters/result width; a
+        ragged sample moves the parameters to a per-sample list and the bulk
+        accessors silently fall back to it.
     """
-    
+
     def __init__(self):
-        self.sample = list()
+        self.sample = _SampleSequence(self)
         self.sample_num = 0
         self.current_sample = None
 
-        
+        # Per-sample columns: names and the original result lists
+        self._sim_names = list()
+        self._res_names = list()
+        self._result_lists = list()
+
+        # Numeric matrices, grown by capacity doubling. _param_rows replaces
+        # _params once the database turns ragged
+        self._params = None
+        self._results = None
+        self._soa_num = 0
+        self._soa_valid = True
+        self._param_rows = None
+        self._result_offsets = None
+
+        # Result names mapped to small ints, for the jitted filter kernel
+        self._name_ids = None
+        self._res_name_id_map = dict()
+
+        # Index keyed by (parameter bytes, result name) for O(1) is_sample
+        # lookups. On duplicates it keeps the first occurrence, matching the
+        # old linear scan
+        self._index = dict()
+
+
     def __iter__(self):
-        self._n_iteration = 0
-        return self
-    
-    def __next__(self):
-        if self._n_iteration < self.sample_num:
-            self._n_iteration += 1
-            return self.sample[self._n_iteration -1]
+        # Delegate to the sample sequence: each loop gets its own iterator,
+        # so nested/concurrent iteration works and no per-step counter is
+        # kept on the collection
+        return iter(self.sample)
+
+    def __len__(self):
+        return self.sample_num
+
+    def _make_sample(self, idx):
+        """ Materialize a Sample view of entry 'idx' from the columns """
+
+        sample = Sample.__new__(Sample)
+        if self._param_rows is not None:
+            sample.parameters = self._param_rows[idx]
         else:
-            raise StopIteration
+            sample.parameters = self._params[idx]
+        sample.parameters_size = sample.parameters.shape[0]
+        sample.simulation_name = self._sim_names[idx]
+        sample.result = self._result_lists[idx]
+        sample.result_size = len(sample.result)
+        sample.result_name = self._res_names[idx]
+        return sample
+
 
-        
     def add_sample(self, parameters, simulation_name, result, result_name):
-        """        
+        """
         Add a sample to the collection
-        
+
         Parameters
         ----------
         parameters: array
@@ -96,108 +202,348 @@ class DataCollection:
             The results generated by the simulation
         result_name: str
             A name for the function that generated the result
-        
+
 
         Returns
         -------
         idx: int
             The index of the added sample
-        
+
         """
-        
-        self.sample.append(Sample(parameters, simulation_name, result, result_name))
+
+        # Single conversion at ingress; a contiguous float64 input is passed
+        # through without copying and the index key reuses the same buffer
+        parameters = np.ascontiguousarray(parameters, dtype=np.float64).reshape(-1)
+        #if result is not a list, make it a list
+        if (type(result)!=list):
+            result = [result]
+
+        self._sim_names.append(simulation_name)
+        self._res_names.append(result_name)
+        self._result_lists.append(result)
+        self._append_numeric(parameters, result, result_name)
+        self.sample_num += 1
+
+        self._index.setdefault(self._index_key(parameters, result_name), self.sample_num-1)
         self.current_sample = self.sample[-1]
-        self.sample_num = len(self.sample)
-        
+
         return self.sample_num-1 #index of the added sample
-        
+
+    @staticmethod
+    def _index_key(parameters, result_name):
+        """ Hashable key identifying a parameter set/result name pair """
+        return (np.ascontiguousarray(parameters, dtype=np.float64).tobytes(), result_name)
+
+    def _append_numeric(self, parameters, result, result_name):
+        """ Append one sample to the numeric matrices, falling back to the
+            per-sample parameter list if the sample does not fit the
+            established row widths """
+
+        if not self._soa_valid:
+            self._param_rows.append(parameters)
+            return
+
+        try:
+            result_elements = [np.asarray(r, dtype=np.float64).ravel() for r in result]
+            result_row = np.concatenate(result_elements) if result_elements else np.empty(0)
+            parameters = np.asarray(parameters, dtype=np.float64)
+        except (TypeError, ValueError):
+            # Non-numeric or otherwise non-flattenable result
+            self._drop_soa()
+            self._param_rows.append(parameters)
+            return
+
+        offsets = np.cumsum([0] + [r.shape[0] for r in result_elements])
+
+        if self._params is None:
+            capacity = 64
+            self._params = np.empty((capacity, parameters.shape[0]))
+            self._results = np.empty((capacity, result_row.shape[0]))
+            self._name_ids = np.empty(capacity, dtype=np.int64)
+            self._result_offsets = offsets
+
+        if (parameters.shape[0] != self._params.shape[1] or
+                result_row.shape[0] != self._results.shape[1] or
+                not np.array_equal(offsets, self._result_offsets)):
+            self._drop_soa()
+            self._param_rows.append(parameters)
+            return
+
+        if self._soa_num == self._params.shape[0]:
+            self._params = np.concatenate((self._params, np.empty_like(self._params)))
+            self._results = np.concatenate((self._results, np.empty_like(self._results)))
+            self._name_ids = np.concatenate((self._name_ids, np.empty_like(self._name_ids)))
+
+        self._params[self._soa_num] = parameters
+        self._results[self._soa_num] = result_row
+        self._name_ids[self._soa_num] = self._res_name_id_map.setdefault(
+            result_name, len(self._res_name_id_map))
+        self._soa_num += 1
+
+    def _drop_soa(self):
+        """ Disable the numeric matrices (ragged database): the stored
+            parameters move to a per-sample list """
+
+        self._param_rows = [self._params[i] for i in range(self._soa_num)] \
+            if self._params is not None else list()
+        self._soa_valid = False
+        self._params = None
+        self._results = None
+        self._soa_num = 0
+        self._result_offsets = None
+        self._name_ids = None
+
+    def sample_matrix(self, idx):
+        """
+        Fetch the parameters of several samples as a single matrix
+
+        Parameters
+        ----------
+        idx: array
+            Indices of the samples to fetch
+
+        Returns
+        -------
+        parameters: array(len(idx), parameters_size)
+            One row per requested sample
+        """
+        if self._soa_valid and self._params is not None:
+            return self._params[np.asarray(idx, dtype=int)]
+        return np.array([self._param_rows[i] for i in idx])
+
+    def result_matrix(self, idx):
+        """
+        Fetch the (flattened) results of several samples as a single matrix
+
+        Parameters
+        ----------
+        idx: array
+            Indices of the samples to fetch
+
+        Returns
+        -------
+        results: array(len(idx), result_size)
+            One row per requested sample
+        """
+        if self._soa_valid and self._results is not None:
+            return self._results[np.asarray(idx, dtype=int)]
+        return np.array([np.concatenate([np.asarray(r, dtype=np.float64).ravel()
+                                         for r in self._result_lists[i]]) for i in idx])
+
     def filter_simulation(self, result_name, result_index = 0, simulation_name = None, lower_bound = None, upper_bound = None):
         filtered_parameters = list()
         filtered_result = list()
         filtered_idx = list()
-        
-        # Convert to numpy arrays, simpler conditions management
-        if lower_bound is not None:
-            lb = np.array(lower_bound)
-        else:
-            lb = None
-        if upper_bound is not None:
-            ub = np.array(upper_bound)
+
+        # Convert to numpy arrays, simpler conditions management. When
+        # result_index is a list the bounds are lists too (possibly with None
+        # entries), keep them as such. Identity checks only: 'lb == None' on
+        # an array compares elementwise and does not mean 'no bound'
+        if type(result_index) is int:
+            lb = np.array(lower_bound) if lower_bound is not None else None
+            ub = np.array(upper_bound) if upper_bound is not None else None
         else:
-            ub = None
-        
+            lb = lower_bound
+            ub = upper_bound
+        has_lb = lb is not None
+        has_ub = ub is not None
+
+        # Vectorized path over the numeric matrices: one mask per condition
+        # instead of one Python iteration per sample
+        if self._soa_valid and self._params is not None:
+            return self._filter_soa(result_name, result_index, simulation_name, lb, ub)
+
         for i in range(0,self.sample_num):
-            if (self.sample[i].result_name == result_name) and ((simulation_name is None) or (self.sample[i].simulation_name in simulation_name)):
+            if (self._res_names[i] == result_name) and ((simulation_name is None) or (self._sim_names[i] in simulation_name)):
                 # Check boundaries
-                res = np.array(self.sample[i].result[result_index])
                 if type(result_index) is int:
-                    if ((lb == None or (res > lb).all()) and
-                        (ub == None or (res < ub).all())):
-                        
-                        filtered_parameters.append(self.sample[i].parameters)
-                        filtered_result.append(self.sample[i].result)
+                    res = np.array(self._result_lists[i][result_index])
+                    if (((not has_lb) or (res > lb).all()) and
+                        ((not has_ub) or (res < ub).all())):
+
+                        filtered_parameters.append(self._param_rows[i])
+                        filtered_result.append(self._result_lists[i])
                         filtered_idx.append(i)
                 else:
                     # It is a list and also boundaries are two lists
-                    to_include = list()
+                    to_include = True
                     for res_idx in range(0, len(result_index)):
-                        res = np.array(self.sample[i].result[res_idx])
-                        if ((lb == None or lb[res_idx] == None or (res > lb[res_idx]).all()) and
-                            (ub == None or lb[res_idx] == None or (res < ub[res_idx]).all())):
-                        
-                            to_include.append(True)
-                        else:
-                            to_include.append(False)
-                    
-                    if all(to_include):
-                        filtered_parameters.append(self.sample[i].parameters)
-                        filtered_result.append(self.sample[i].result)
+                        res = np.array(self._result_lists[i][res_idx])
+                        if has_lb and lb[res_idx] is not None and not (res > np.asarray(lb[res_idx])).all():
+                            to_include = False
+                        if has_ub and ub[res_idx] is not None and not (res < np.asarray(ub[res_idx])).all():
+                            to_include = False
+
+                    if to_include:
+                        filtered_parameters.append(self._param_rows[i])
+                        filtered_result.append(self._result_lists[i])
                         filtered_idx.append(i)
-        
+
+        return (filtered_parameters, filtered_result, filtered_idx)
+
+    def _filter_soa(self, result_name, result_index, simulation_name, lb, ub):
+        """ Mask-based implementation of filter_simulation on the numeric
+            matrices. Same selection rules, returns the stored objects """
+
+        results = self._results[:self._soa_num]
+        offsets = self._result_offsets
+
+        mask = None
+        if _bounds_kernel is not None and type(result_index) is int:
+            # Fused kernel: name match and bound checks in one pass
+            block = results[:, offsets[result_index]:offsets[result_index+1]]
+            width = block.shape[1]
+            try:
+                lb_full = (np.ascontiguousarray(np.broadcast_to(np.asarray(lb, dtype=np.float64), (width,)))
+                           if lb is not None else np.empty(0))
+                ub_full = (np.ascontiguousarray(np.broadcast_to(np.asarray(ub, dtype=np.float64), (width,)))
+                           if ub is not None else np.empty(0))
+            except ValueError:
+                # Bounds not broadcastable to the block, numpy path decides
+                pass
+            else:
+                mask = _bounds_kernel(np.ascontiguousarray(block),
+                                      self._name_ids[:self._soa_num],
+                                      self._res_name_id_map.get(result_name, -1),
+                                      lb_full, ub_full,
+                                      lb is not None, ub is not None)
+
+        if mask is None:
+            mask = np.asarray(self._res_names) == result_name
+
+            if type(result_index) is int:
+                block = results[:, offsets[result_index]:offsets[result_index+1]]
+                if lb is not None:
+                    mask &= (block > lb).all(axis=1)
+                if ub is not None:
+                    mask &= (block < ub).all(axis=1)
+            else:
+                # result_index is a list and the boundaries are lists as well
+                for res_idx in range(0, len(result_index)):
+                    block = results[:, offsets[res_idx]:offsets[res_idx+1]]
+                    if lb is not None and lb[res_idx] is not None:
+                        mask &= (block > lb[res_idx]).all(axis=1)
+                    if ub is not None and ub[res_idx] is not None:
+                        mask &= (block < ub[res_idx]).all(axis=1)
+
+        if simulation_name is not None:
+            if isinstance(simulation_name, str):
+                # Substring semantics, same as 'name in simulation_name'
+                mask &= np.array([name in simulation_name for name in self._sim_names])
+            else:
+                mask &= np.isin(np.asarray(self._sim_names), simulation_name)
+
+        filtered_idx = np.nonzero(mask)[0].tolist()
+        filtered_parameters = [self._params[i] for i in filtered_idx]
+        filtered_result = [self._result_lists[i] for i in filtered_idx]
+
         return (filtered_parameters, filtered_result, filtered_idx)
-    
+
     def is_sample(self, parameters, result_name):
-        sample_found = False
-        idx = None
-     
-        for i in range(0,self.sample_num):
-            if len(parameters) == self.sample[i].parameters_size:
-                if all(self.sample[i].parameters == parameters) and (self.sample[i].result_name is result_name):
-                    sample_found = True
-                    idx = i
-                    break
-                
-        return sample_found, idx
-    
+        # _index_key normalizes the dtype itself, no separate conversion here
+        idx = self._index.get(self._index_key(parameters, result_name))
+        return idx is not None, idx
+
     def load_from_csv(self, file_name, parameters_size):
         """ Load data from csv. Assumes the first parameter_size colums are parameters,
-            then simulation name, than result name, while all the other columns are different results """
-        
-        with open(file_name) as csvDataFile:
-            csvReader = csv.reader(csvDataFile)
-            for row in csvReader:
-                simulation_name = str(row[0:1])[2:-2] # Remove brakets and quotation marks 
-                result_name = str(row[1:2])[2:-2] # Remove brakets and quotation marks 
-                params = np.float64(row[2:parameters_size+2])
-                res = np.float64(row[parameters_size+2:])
-                self.add_sample(parameters = params, simulation_name = simulation_name, result = res, result_name = result_name)
-                
+            then simulation name, than result name, while all the other columns are different results.
+            The whole file is parsed in one pass and bulk-appended """
+
+        raw = np.loadtxt(file_name, delimiter = ',', dtype = str, ndmin = 2)
+        if raw.size == 0:
+            return
+
+        self.add_samples_bulk(parameters = raw[:, 2:parameters_size+2].astype(np.float64),
+                              simulation_names = raw[:, 0].tolist(),
+                              results = raw[:, parameters_size+2:].astype(np.float64),
+                              result_names = raw[:, 1].tolist())
+
+    def add_samples_bulk(self, parameters, simulation_names, results, result_names):
+        """
+        Append many samples at once
+
+        Parameters
+        ----------
+        parameters: array(n, parameters_size)
+            One parameter set per row
+        simulation_names: list
+            Name of the simulation stage, one per sample
+        results: array(n, result_size)
+            One (flat) result per row
+        result_names: list
+            Name of the function that generated the result, one per sample
+
+        Returns
+        -------
+        idx: array
+            The indices of the added samples
+
+        """
+
+        parameters = np.ascontiguousarray(parameters, dtype=np.float64)
+        results = np.ascontiguousarray(results, dtype=np.float64)
+        start = self.sample_num
+
+        self._sim_names.extend(simulation_names)
+        self._res_names.extend(result_names)
+        self._result_lists.extend([row] for row in results)
+        self.sample_num += parameters.shape[0]
+
+        # Extend the numeric matrices in one shot
+        if self._soa_valid:
+            offsets = np.array([0, results.shape[1]])
+            name_ids = np.array([self._res_name_id_map.setdefault(name, len(self._res_name_id_map))
+                                 for name in result_names], dtype=np.int64)
+            if self._params is None:
+                self._params = parameters.copy()
+                self._results = results.copy()
+                self._name_ids = name_ids
+                self._result_offsets = offsets
+                self._soa_num = parameters.shape[0]
+            elif (parameters.shape[1] == self._params.shape[1] and
+                  np.array_equal(offsets, self._result_offsets)):
+                self._params = np.concatenate((self._params[:self._soa_num], parameters))
+                self._results = np.concatenate((self._results[:self._soa_num], results))
+                self._name_ids = np.concatenate((self._name_ids[:self._soa_num], name_ids))
+                self._soa_num = self._params.shape[0]
+            else:
+                self._drop_soa()
+                self._param_rows.extend(parameters)
+        else:
+            self._param_rows.extend(parameters)
+
+        # Index the new block, first occurrence wins as usual
+        for i in range(parameters.shape[0]):
+            self._index.setdefault((parameters[i].tobytes(), result_names[i]), start+i)
+
+        if self.sample_num > 0:
+            self.current_sample = self.sample[-1]
+
+        return np.arange(start, self.sample_num)
+
     def export_to_csv(self, file_name):
         """ Export the database to a csv file """
-        
+
         with open(file_name, 'w', newline='') as csvDataFile:
             csvWriter = csv.writer(csvDataFile, delimiter = ',')
 
-            for i in range(0,self.sample_num):
-                data = list()
-                data.append(self.sample[i].simulation_name)
-                data.append(self.sample[i].result_name)
-                data.extend(self.sample[i].parameters.tolist())
-                data.extend(self.sample[i].result)                                 
-                csvWriter.writerow(data)
-
-        
-        
-        
-        
-        
\ No newline at end of file
+            if self._soa_valid and self._params is not None:
+                # Columnar path: one bulk tolist() converts all the numbers,
+                # one writerows() streams them, instead of per-sample list
+                # building. Results are written flattened, which is also the
+                # only layout load_from_csv can read back
+                numeric = np.hstack((self._params[:self._soa_num],
+                                     self._results[:self._soa_num])).tolist()
+                csvWriter.writerows([sim_name, res_name] + row
+                                    for sim_name, res_name, row
+                                    in zip(self._sim_names, self._res_names, numeric))
+            else:
+                rows = list()
+                for i in range(0,self.sample_num):
+                    data = list()
+                    data.append(self._sim_names[i])
+                    data.append(self._res_names[i])
+                    data.extend(np.asarray(self._param_rows[i]).tolist())
+                    data.extend(self._result_lists[i])
+                    rows.append(data)
+                csvWriter.writerows(rows)
@@ -8,11 +8,11 @@ class Map:
         The dimensionality reduction model
     training_data_idx: list
         The index in the database (data_collection class) of the data used for the training
-    projected_grid: list
-        List of the sampled points, in the reduced space 
-    normalized_projected_grid: list
-        List of the sampled points, in the reduced space but normalized 
-        such that the distance between two consecutive points in each 
+    projected_grid: array
+        The sampled points, in the reduced space
+    normalized_projected_grid: array
+        The sampled points, in the reduced space but normalized
+        such that the distance between two consecutive points in each
         dimension is the same
     sim_idx: list
         The index in the database (data_collection class) of the simulations that are part of the map
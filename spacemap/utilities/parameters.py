@@ -3,9 +3,13 @@ import datetime
 class Parameters:
     """
         Empty class to store parameters
+
+        Declaring '__dict__' as the only slot keeps the bag fully dynamic
+        while dropping the per-instance __weakref__ and letting subclasses
+        declare fixed slots for their known fields
     """
-        
-    pass
+
+    __slots__ = ('__dict__',)
 
 class Settings(Parameters):
     """
@@ -23,13 +27,22 @@ class Settings(Parameters):
             Settings for dimensionality reduction
 
     """
-        
+
+    # The four groups are fixed: slot descriptors make their access a
+    # fixed-offset load instead of a dict lookup. Anything else a user
+    # attaches still lands in the inherited __dict__
+    __slots__ = ('general', 'study', 'sampler', 'dimensionality_reduction')
+
     def __init__(self):
-                
+
         self.general = Parameters()
         self.general.suffix = 'SpaceMapping_' + datetime.datetime.now().strftime("%Y_%m_%d_%I_%M")
         self.general.comments = ''
         self.general.autosave = True
+        # Coalesce autosave writes: save at most every 'autosave_interval'
+        # seconds or every 'autosave_every_n' iterations, whichever comes first
+        self.general.autosave_interval = 30
+        self.general.autosave_every_n = 10
         
         self.study = Parameters()
         self.study.type = 'LumericalFDTD'